@@ -0,0 +1,75 @@
+# bench_db_write.py
+# 写入性能对比: pandas to_sql (每张表一次 executemany、各自一个事务)
+#          vs DBManager.save_batch (每日一个事务)，索引重建耗时单独统计
+# 用法: python bench_db_write.py [天数] [每日股票数]
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from db_manager import DBManager
+
+
+def make_day(date, n_stocks):
+    """构造一个交易日的模拟日线 + 资金流数据"""
+    codes = [f"{i:06d}.SZ" for i in range(n_stocks)]
+    rng = np.random.default_rng(int(date))
+    close = rng.uniform(5, 100, n_stocks).round(2)
+    df_daily = pd.DataFrame({
+        'ts_code': codes, 'trade_date': date,
+        'open': close, 'high': close * 1.02, 'low': close * 0.98, 'close': close,
+        'pre_close': close, 'change': 0.0, 'pct_chg': rng.normal(0, 2, n_stocks).round(2),
+        'vol': rng.uniform(1e3, 1e6, n_stocks), 'amount': rng.uniform(1e4, 1e7, n_stocks),
+    })
+    df_flow = pd.DataFrame({
+        'ts_code': codes, 'trade_date': date,
+        'buy_lg_amount': rng.uniform(0, 1e4, n_stocks), 'sell_lg_amount': rng.uniform(0, 1e4, n_stocks),
+        'net_mf_amount': rng.normal(0, 1e3, n_stocks),
+    })
+    return df_daily, df_flow
+
+
+def run_legacy(db, days):
+    # 原路径: 每张表一次 to_sql (内部同样是 executemany)，每日两个事务，无索引
+    for df_daily, df_flow in days:
+        df_daily.to_sql('daily_price', db.engine, if_exists='append', index=False)
+        df_flow.to_sql('money_flow', db.engine, if_exists='append', index=False)
+
+
+def run_bulk(db, days):
+    # 新路径: 删索引 -> 每日一个事务写入两张表
+    db.drop_indexes()
+    for df_daily, df_flow in days:
+        db.save_batch([(df_daily, 'daily_price'), (df_flow, 'money_flow')])
+
+
+def bench(name, func, days, with_index=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(db_path=os.path.join(tmp, 'bench.db'))
+        rows = sum(len(a) + len(b) for a, b in days)
+        start = time.perf_counter()
+        func(db, days)
+        cost = time.perf_counter() - start
+        print(f"{name:<8} {rows:>10} 行  {cost:8.2f} 秒  {rows / cost:>12,.0f} 行/秒 (不含索引)")
+
+        if with_index:
+            start = time.perf_counter()
+            db.create_indexes()
+            index_cost = time.perf_counter() - start
+            print(f"{'':<8} 索引重建 {index_cost:8.2f} 秒  含索引合计 {rows / (cost + index_cost):>12,.0f} 行/秒")
+        db.engine.dispose()
+    return rows / cost
+
+
+if __name__ == "__main__":
+    n_days = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    n_stocks = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    dates = pd.bdate_range('2024-01-01', periods=n_days).strftime('%Y%m%d')
+    days = [make_day(d, n_stocks) for d in dates]
+    print(f"📊 写入基准: {n_days} 天 x {n_stocks} 只")
+
+    legacy = bench('to_sql', run_legacy, days)
+    bulk = bench('bulk', run_bulk, days, with_index=True)
+    print(f"🚀 写入提速 (不含索引): {bulk / legacy:.1f}x")
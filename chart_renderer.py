@@ -0,0 +1,189 @@
+import os
+import shutil
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import Config
+
+
+def _render_chart(df, ts_code, trade_date, path):
+    """
+    子进程中执行：绘制 K 线 + 成交量图并保存为 PNG
+    df 为按日期升序的日线数据 (需包含 VOL_MA_DAYS 天的预热数据)
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    # 量能均线 / 箱体上沿口径与策略一致：均不含当日
+    df = df.reset_index(drop=True)
+    vol_ma = df['vol'].rolling(Config.VOL_MA_DAYS).mean().shift(1)
+    box_high = df['high'].iloc[-Config.BOX_DAYS - 1:-1].max()
+
+    df = df.tail(Config.CHART_DAYS).reset_index(drop=True)
+    vol_ma = vol_ma.tail(Config.CHART_DAYS).reset_index(drop=True)
+    x = df.index
+    # A 股习惯：红涨绿跌
+    colors = ['#e74c3c' if c >= o else '#2ecc71' for o, c in zip(df['open'], df['close'])]
+
+    fig, (ax_k, ax_v) = plt.subplots(2, 1, figsize=(6, 4), dpi=100, sharex=True,
+                                     gridspec_kw={'height_ratios': [3, 1]})
+    ax_k.vlines(x, df['low'], df['high'], colors=colors, linewidth=0.8)
+    ax_k.bar(x, (df['close'] - df['open']).abs(), bottom=df[['open', 'close']].min(axis=1),
+             color=colors, width=0.7)
+    ax_k.axhline(box_high, color='#3498db', linestyle='--', linewidth=1, label=f'Box high {box_high:.2f}')
+    ax_k.set_title(f"{ts_code} {trade_date}", fontsize=9)
+    ax_k.legend(loc='upper left', fontsize=7)
+    ax_k.grid(alpha=0.3)
+
+    ax_v.bar(x, df['vol'], color=colors, width=0.7)
+    ax_v.plot(x, vol_ma, color='#f39c12', linewidth=1, label=f'Vol MA{Config.VOL_MA_DAYS}')
+    ax_v.legend(loc='upper left', fontsize=7)
+    ax_v.grid(alpha=0.3)
+
+    step = max(len(df) // 6, 1)
+    ax_v.set_xticks(x[::step])
+    ax_v.set_xticklabels(df['trade_date'].iloc[::step], fontsize=7)
+    ax_k.tick_params(labelsize=7)
+    ax_v.tick_params(labelsize=7)
+
+    fig.tight_layout()
+    # 先写临时文件再改名，避免其他线程读到半张图
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fig.savefig(tmp_path, format='png')
+    plt.close(fig)
+    os.replace(tmp_path, path)
+    return path
+
+
+class ChartRenderer:
+    """
+    候选股图表渲染：进程池并行绘图，按 (ts_code, trade_date) 缓存到磁盘
+    同一张图只渲染一次，17:00 日报和重复 /scan 共用缓存
+    """
+    def __init__(self, data_manager, chart_dir=Config.CHART_DIR):
+        self.dm = data_manager
+        self.chart_dir = chart_dir
+        self._pool = None
+        self._pending = {}  # (ts_code, trade_date) -> (Future, 渲染参数)，避免并发重复渲染
+        self._lock = threading.Lock()
+
+    def start(self):
+        """拉起进程池 (render 时会自动调用)"""
+        with self._lock:
+            self._ensure_pool()
+        return self
+
+    def _ensure_pool(self):
+        # 调用方须持有 _lock
+        if self._pool is None:
+            # spawn 而非 fork：多线程进程中 fork 可能继承被其他线程持有的锁而死锁
+            self._pool = ProcessPoolExecutor(max_workers=Config.CHART_WORKERS,
+                                             mp_context=multiprocessing.get_context('spawn'))
+
+    def _drop_pool(self):
+        # 调用方须持有 _lock；子进程异常退出 (如 OOM kill) 后进程池不可再用
+        print("⚠️ 渲染进程池已损坏，正在重建...")
+        self._pool.shutdown(wait=False)
+        self._pool = None
+        self._pending.clear()
+
+    def _submit(self, key, args):
+        # 调用方须持有 _lock
+        try:
+            self._ensure_pool()
+            future = self._pool.submit(_render_chart, *args)
+        except BrokenProcessPool:
+            self._drop_pool()
+            self._ensure_pool()
+            future = self._pool.submit(_render_chart, *args)
+        self._pending[key] = (future, args)
+        return future
+
+    def _wait(self, key, future, args):
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # 进程池崩溃：若尚无其他线程处理，则重建并重新提交一次
+            with self._lock:
+                # 其他等待者可能已重新渲染完成并移出 _pending
+                if os.path.exists(args[-1]):
+                    return args[-1]
+                entry = self._pending.get(key)
+                if entry is None or entry[0] is future:
+                    if entry is not None:
+                        self._drop_pool()
+                    future = self._submit(key, args)
+                else:
+                    future = entry[0]
+            return future.result()
+
+    def chart_path(self, ts_code, trade_date):
+        return os.path.join(self.chart_dir, trade_date, f"{ts_code}.png")
+
+    def prune(self, trade_date):
+        """删除早于最近 CHART_KEEP_DAYS 个交易日的图表目录，避免缓存无限增长"""
+        if not os.path.isdir(self.chart_dir):
+            return
+        cutoff, _ = self.dm.get_trade_window(trade_date, Config.CHART_KEEP_DAYS)
+        for name in os.listdir(self.chart_dir):
+            if name < cutoff:
+                shutil.rmtree(os.path.join(self.chart_dir, name), ignore_errors=True)
+
+    def render(self, stocks, trade_date):
+        """
+        渲染候选股图表，返回 [(stock, png_path)]，渲染失败的标的会被跳过
+        阻塞直到所有图表就绪，调用方应在后台线程中使用
+        """
+        self.start()
+        self.prune(trade_date)
+        os.makedirs(os.path.join(self.chart_dir, trade_date), exist_ok=True)
+
+        jobs = []
+        missing = []
+        with self._lock:
+            for s in stocks:
+                key = (s['ts_code'], trade_date)
+                path = self.chart_path(*key)
+                if os.path.exists(path):
+                    jobs.append((s, path, None))
+                elif key in self._pending:
+                    jobs.append((s, path, self._pending[key]))
+                else:
+                    missing.append(s)
+
+        # 缓存未命中的标的一次性从本地 daily_price 读取
+        if missing:
+            days = max(Config.CHART_DAYS, Config.BOX_DAYS + 1) + Config.VOL_MA_DAYS
+            codes = [s['ts_code'] for s in missing]
+            df_all = self.dm.get_history_batch(codes, trade_date, days=days)
+            grouped = dict(tuple(df_all.groupby('ts_code'))) if not df_all.empty else {}
+
+            with self._lock:
+                for s in missing:
+                    key = (s['ts_code'], trade_date)
+                    path = self.chart_path(*key)
+                    if os.path.exists(path):
+                        jobs.append((s, path, None))
+                        continue
+                    if key not in self._pending:
+                        df = grouped.get(s['ts_code'])
+                        if df is None: continue
+                        df = df.sort_values('trade_date')
+                        self._submit(key, (df, s['ts_code'], trade_date, path))
+                    jobs.append((s, path, self._pending[key]))
+
+        charts = []
+        for s, path, entry in jobs:
+            key = (s['ts_code'], trade_date)
+            try:
+                if entry is not None:
+                    self._wait(key, *entry)
+                charts.append((s, path))
+            except Exception as e:
+                print(f"⚠️ 图表渲染失败 {s['ts_code']}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+        return charts
@@ -14,6 +14,16 @@ class Config:
     FLOW_DAYS = 3           # 资金连买天数 (规则4)
     SECTOR_TOP_PCT = 0.2    # 板块前 20% (规则3)
     RS_BENCHMARK = '000300.SH' # RS对比基准 (沪深300)
+
+    # 数据参数
+    CALENDAR_START = '20150101' # 交易日历缓存起始日期
+    BULK_SYNC_DAYS = 20         # 同步天数超过该值时视为回填，暂停索引维护
+
+    # 图表参数
+    CHART_DIR = '/app/data/charts' # 图表缓存目录
+    CHART_DAYS = 60         # 图表展示的 K 线根数
+    CHART_WORKERS = 2       # 渲染进程数
+    CHART_KEEP_DAYS = 5     # 图表缓存保留的交易日数
     
     # 调试模式 (True时会打印更多日志)
     DEBUG = True
@@ -1,6 +1,7 @@
 import tushare as ts
 import pandas as pd
 import time
+from bisect import bisect_right
 from datetime import datetime, timedelta
 from config import Config
 from db_manager import DBManager
@@ -10,6 +11,45 @@ class DataManager:
         ts.set_token(Config.TUSHARE_TOKEN)
         self.pro = ts.pro_api(timeout=120) 
         self.db = DBManager()
+        # 交易日历缓存 (升序的开市日列表) 及其已覆盖到的日期
+        self._calendar = []
+        self._calendar_end = None
+
+    def get_trade_calendar(self, end_date=None):
+        """
+        获取交易日历 (升序的开市日列表)
+        优先读内存 / 本地 trade_cal 表，覆盖不到 end_date 时才请求 Tushare
+        """
+        end_date = end_date or datetime.now().strftime('%Y%m%d')
+        if self._calendar_end and end_date <= self._calendar_end:
+            return self._calendar
+
+        # 1. 先读本地缓存
+        if self.db.check_latest_date('trade_cal'):
+            df = self.db.get_data('trade_cal')
+            self._calendar = sorted(df['trade_date'].tolist())
+            self._calendar_end = self._calendar[-1]
+            if end_date <= self._calendar_end:
+                return self._calendar
+
+        # 2. 缓存不足，一次性拉到当年年底 (交易所年初即公布全年日历)
+        df = self.pro.trade_cal(exchange='', start_date=Config.CALENDAR_START,
+                                end_date=f"{end_date[:4]}1231", is_open='1')
+        self._calendar = sorted(df['cal_date'].tolist())
+        self._calendar_end = max(self._calendar[-1], end_date) if self._calendar else end_date
+        self.db.save_data(pd.DataFrame({'trade_date': self._calendar}), 'trade_cal', if_exists='replace')
+        return self._calendar
+
+    def get_trade_window(self, trade_date, days):
+        """
+        返回截至 trade_date (含) 最近 days 个交易日的 (start_date, end_date)
+        按交易日而非自然日计算，长假前后也能取到准确的行数
+        """
+        calendar = self.get_trade_calendar(trade_date)
+        idx = bisect_right(calendar, trade_date)
+        if idx == 0:
+            return trade_date, trade_date
+        return calendar[max(idx - days, 0)], trade_date
 
     def get_trade_date(self):
         """
@@ -19,11 +59,8 @@ class DataManager:
         now = datetime.now()
         today_str = now.strftime('%Y%m%d')
         
-        # 往前推 30 天查日历
-        start = (now - timedelta(days=30)).strftime('%Y%m%d')
-        df = self.pro.trade_cal(exchange='', start_date=start, end_date=today_str, is_open='1')
-        df = df.sort_values('cal_date')
-        trade_dates = df['cal_date'].values
+        calendar = self.get_trade_calendar(today_str)
+        trade_dates = calendar[:bisect_right(calendar, today_str)]
         
         # === 核心修复逻辑 ===
         # 如果获取到的最后一天是“今天”，但现在还没到 16:00 (收盘后数据整理时间)
@@ -45,7 +82,8 @@ class DataManager:
         latest_in_db = self.db.check_latest_date('daily_price')
         
         if latest_in_db is None:
-            start_date = (pd.to_datetime(end_date) - timedelta(days=lookback_days)).strftime('%Y%m%d')
+            # 按交易日回溯，避免春节等长假导致数据不足
+            start_date, _ = self.get_trade_window(end_date, lookback_days)
             print(f"⚡️ 首次初始化模式: {start_date} -> {end_date}")
         elif latest_in_db < end_date:
             start_date = (pd.to_datetime(latest_in_db) + timedelta(days=1)).strftime('%Y%m%d')
@@ -54,10 +92,8 @@ class DataManager:
             print(f"✅ 数据已是最新 (DB: {latest_in_db} == Target: {end_date})")
             return 0, 0, f"数据已最新 ({latest_in_db})"
 
-        # 获取交易日
-        cal = self.pro.trade_cal(exchange='', start_date=start_date, end_date=end_date, is_open='1')
-        cal = cal.sort_values('cal_date')
-        trade_dates = cal['cal_date'].tolist()
+        # 获取交易日 (本地日历缓存)
+        trade_dates = [d for d in self.get_trade_calendar(end_date) if start_date <= d <= end_date]
 
         if not trade_dates:
             return 0, 0, f"无新交易日 ({start_date}-{end_date})"
@@ -66,32 +102,42 @@ class DataManager:
         fail_count = 0
         last_error = ""
 
-        for date in trade_dates:
-            print(f"📥 下载全市场: {date} ...")
-            retry_times = 3
-            
-            for i in range(retry_times):
-                try:
-                    # A. 日线
-                    df_daily = self.pro.daily(trade_date=date)
-                    print(f"   -> 日线: {len(df_daily)} 行")
-                    self.db.save_data(df_daily, 'daily_price')
-                    
-                    # B. 资金流
-                    df_flow = self.pro.moneyflow(trade_date=date)
-                    self.db.save_data(df_flow, 'money_flow')
-                    
-                    success_count += 1
-                    time.sleep(1.0)
-                    break 
-                    
-                except Exception as e:
-                    print(f"⚠️ {date} 重试 {i+1}/{retry_times}: {e}")
-                    if i == retry_times - 1:
-                        fail_count += 1
-                        last_error = str(e)
-                    else:
-                        time.sleep(5)
+        # 大批量回填时先删索引，全部写完再重建，避免逐行维护索引
+        bulk_mode = len(trade_dates) > Config.BULK_SYNC_DAYS
+        if bulk_mode:
+            print(f"🚚 回填模式: {len(trade_dates)} 天，暂停索引维护")
+            self.db.drop_indexes()
+
+        try:
+            for date in trade_dates:
+                print(f"📥 下载全市场: {date} ...")
+                retry_times = 3
+                
+                for i in range(retry_times):
+                    try:
+                        # A. 日线
+                        df_daily = self.pro.daily(trade_date=date)
+                        print(f"   -> 日线: {len(df_daily)} 行")
+                        
+                        # B. 资金流
+                        df_flow = self.pro.moneyflow(trade_date=date)
+                        
+                        # 同一交易日的两张表在一个事务内写入，重试不会产生重复数据
+                        self.db.save_batch([(df_daily, 'daily_price'), (df_flow, 'money_flow')])
+                        
+                        success_count += 1
+                        time.sleep(1.0)
+                        break 
+                        
+                    except Exception as e:
+                        print(f"⚠️ {date} 重试 {i+1}/{retry_times}: {e}")
+                        if i == retry_times - 1:
+                            fail_count += 1
+                            last_error = str(e)
+                        else:
+                            time.sleep(5)
+        finally:
+            self.db.create_indexes()
 
         # 更新列表
         try:
@@ -101,23 +147,25 @@ class DataManager:
             
         return success_count, fail_count, last_error
 
-    # ============ 其他接口保持不变 ============
-    
-    def get_history_batch(self, codes, days=60):
-        start_date = (datetime.now() - timedelta(days=days*2)).strftime('%Y%m%d')
-        return self.db.get_data('daily_price', start_date=start_date, codes=codes)
+    # ============ 读取接口 ============
+    # 以下读取接口均为 as-of 语义：只取截至 trade_date 的最近 days 个交易日，
+    # 不依赖当前时间，可对任意历史日期复现扫描
+
+    def get_history_batch(self, codes, trade_date, days=60):
+        start_date, end_date = self.get_trade_window(trade_date, days)
+        return self.db.get_data('daily_price', start_date=start_date, end_date=end_date, codes=codes)
 
-    def get_moneyflow_batch(self, codes, days=10):
-        start_date = (datetime.now() - timedelta(days=days*2)).strftime('%Y%m%d')
-        return self.db.get_data('money_flow', start_date=start_date, codes=codes)
+    def get_moneyflow_batch(self, codes, trade_date, days=10):
+        start_date, end_date = self.get_trade_window(trade_date, days)
+        return self.db.get_data('money_flow', start_date=start_date, end_date=end_date, codes=codes)
     
-    def get_history_from_db(self, days=60):
-        start_date = (datetime.now() - timedelta(days=days*2)).strftime('%Y%m%d')
-        return self.db.get_data('daily_price', start_date=start_date)
+    def get_history_from_db(self, trade_date, days=60):
+        start_date, end_date = self.get_trade_window(trade_date, days)
+        return self.db.get_data('daily_price', start_date=start_date, end_date=end_date)
 
-    def get_moneyflow_from_db(self, days=10):
-        start_date = (datetime.now() - timedelta(days=days*2)).strftime('%Y%m%d')
-        return self.db.get_data('money_flow', start_date=start_date)
+    def get_moneyflow_from_db(self, trade_date, days=10):
+        start_date, end_date = self.get_trade_window(trade_date, days)
+        return self.db.get_data('money_flow', start_date=start_date, end_date=end_date)
     
     def get_stock_basics(self):
         return self.db.get_data('stock_basic')
@@ -136,7 +184,7 @@ class DataManager:
         return self.pro.index_member(index_code=sector_code)['con_code'].tolist()
         
     def get_benchmark_return(self, end_date, days=20):
-        start_date = (pd.to_datetime(end_date) - timedelta(days=days*2)).strftime('%Y%m%d')
+        start_date, _ = self.get_trade_window(end_date, days)
         df = self.pro.index_daily(ts_code=Config.RS_BENCHMARK, start_date=start_date, end_date=end_date)
         if len(df) < days: return 0
         df = df.head(days)
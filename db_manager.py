@@ -3,6 +3,14 @@ from sqlalchemy import create_engine, text
 import pandas as pd
 
 class DBManager:
+    # 查询索引: 按日期窗口 + 股票代码读取
+    INDEXES = {
+        'idx_daily_price_date': ('daily_price', 'trade_date'),
+        'idx_daily_price_code_date': ('daily_price', 'ts_code, trade_date'),
+        'idx_money_flow_date': ('money_flow', 'trade_date'),
+        'idx_money_flow_code_date': ('money_flow', 'ts_code, trade_date'),
+    }
+
     def __init__(self, db_path='/app/data/quant.db'):
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         # 初始化数据库引擎
@@ -10,14 +18,47 @@ class DBManager:
         
     def save_data(self, df, table_name, if_exists='append'):
         """保存数据到数据库"""
-        if df.empty: return
         try:
-            # 这里的 to_sql Pandas 会自动处理连接，通常没问题
-            # 如果报错，也可以改为 with self.engine.connect() as conn: ...
-            df.to_sql(table_name, self.engine, if_exists=if_exists, index=False)
+            self.save_batch([(df, table_name)], if_exists=if_exists)
         except Exception as e:
             print(f"❌ 保存 {table_name} 失败: {e}")
 
+    def save_batch(self, frames, if_exists='append'):
+        """
+        批量写入多张表 (如同一交易日的 daily_price + money_flow)
+        所有表在同一个事务内用 executemany 写入，失败整体回滚并抛出异常
+        """
+        with self.engine.begin() as conn:
+            for df, table_name in frames:
+                if df is None or df.empty: continue
+                self._insert_frame(conn, df, table_name, if_exists)
+
+    def _insert_frame(self, conn, df, table_name, if_exists):
+        # 建表 (replace 时重建) 交给 pandas，只写表结构不写数据
+        df.head(0).to_sql(table_name, conn, if_exists=if_exists, index=False)
+
+        cols = ','.join(f'"{c}"' for c in df.columns)
+        marks = ','.join(['?'] * len(df.columns))
+        # 转为 Python 原生类型，NaN -> NULL
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        conn.exec_driver_sql(f'INSERT INTO {table_name} ({cols}) VALUES ({marks})', list(rows))
+
+    def create_indexes(self):
+        """创建查询索引 (已存在则跳过)"""
+        with self.engine.begin() as conn:
+            for name, (table_name, cols) in self.INDEXES.items():
+                if not self._table_exists(conn, table_name): continue
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table_name} ({cols})"))
+
+    def drop_indexes(self):
+        """删除查询索引，大批量回填前调用，写完后再 create_indexes 重建"""
+        with self.engine.begin() as conn:
+            for name in self.INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    def _table_exists(self, conn, table_name):
+        return conn.execute(text(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'")).fetchone() is not None
+
     def get_data(self, table_name, start_date=None, end_date=None, codes=None):
         """
         【关键修复】读取数据
@@ -1,6 +1,7 @@
 # main.py
 import os
 import time
+import shutil
 import telebot
 import threading
 from datetime import datetime, timedelta
@@ -9,6 +10,7 @@ from sqlalchemy import text
 from config import Config
 from data_manager import DataManager
 from strategy import StrategyAnalyzer
+from chart_renderer import ChartRenderer
 
 # ==================== 初始化 Flask 和 Bot ====================
 app = Flask(__name__)
@@ -17,6 +19,7 @@ bot = telebot.TeleBot(Config.TG_BOT_TOKEN)
 # 初始化数据和策略模块
 dm = DataManager()
 strategy = StrategyAnalyzer(dm)
+chart_renderer = ChartRenderer(dm)
 
 
 def is_authorized(message):
@@ -27,6 +30,32 @@ def is_authorized(message):
     return True
 
 
+def send_charts_async(chat_id, results, trade_date):
+    """后台线程渲染并发送前 10 只候选股的 K 线图，不阻塞扫描线程"""
+    def worker():
+        try:
+            charts = chart_renderer.render(results[:10], trade_date)
+            if not charts:
+                return
+            files = [open(path, 'rb') for _, path in charts]
+            try:
+                if len(files) == 1:
+                    s = charts[0][0]
+                    bot.send_photo(chat_id, files[0], caption=f"{s['name']} ({s['ts_code']})")
+                else:
+                    media = [telebot.types.InputMediaPhoto(f, caption=f"{s['name']} ({s['ts_code']})")
+                             for (s, _), f in zip(charts, files)]
+                    bot.send_media_group(chat_id, media)
+            finally:
+                for f in files:
+                    f.close()
+            print(f"🖼️ 已发送 {len(charts)} 张图表")
+        except Exception as e:
+            print(f"❌ 图表发送失败: {e}")
+
+    threading.Thread(target=worker, daemon=True).start()
+
+
 # ==================== 命令处理 ====================
 
 @bot.message_handler(commands=['start', 'help'])
@@ -59,10 +88,12 @@ def handle_reset(message):
         if os.path.exists(db_path):
             os.remove(db_path)
             bot.send_message(message.chat.id, "🗑️ 旧数据库文件已删除。")
+        shutil.rmtree(Config.CHART_DIR, ignore_errors=True)
         
         global dm, strategy
         dm = DataManager()
         strategy = StrategyAnalyzer(dm)
+        chart_renderer.dm = dm
         
         bot.send_message(message.chat.id,
                          "✅ **重置成功！**\n请立即发送 `/update` 重新下载最近 60 天的数据。",
@@ -135,7 +166,8 @@ def handle_scan(message):
     print("🚀 用户手动触发 /scan，开始策略分析...")
     
     try:
-        results = strategy.run_daily_scan()
+        trade_date = dm.get_trade_date()
+        results = strategy.run_daily_scan(trade_date)
         
         if not results:
             bot.send_message(message.chat.id, "📅 扫描完成，今日无符合模型的标的。")
@@ -146,6 +178,7 @@ def handle_scan(message):
                 msg += f"   现价: `{s['price']}`\n"
                 msg += f"   理由: {s['reason']}\n\n"
             bot.send_message(message.chat.id, msg, parse_mode='Markdown')
+            send_charts_async(message.chat.id, results, trade_date)
         
         print(f"🏁 用户 /scan 完成，最终选中 {len(results)} 只")
         
@@ -233,8 +266,8 @@ def daily_auto_task():
 
             # 3. 自动选股扫描
             print("🚀 自动任务：开始选股扫描...")
-            results = strategy.run_daily_scan()
             trade_date = dm.get_trade_date()
+            results = strategy.run_daily_scan(trade_date)
 
             # 4. 构建并推送报告
             if not results:
@@ -254,6 +287,8 @@ def daily_auto_task():
                     msg += f"... 共 {len(results)} 只（更多请手动 /scan 查看）"
 
             bot.send_message(Config.TG_CHAT_ID, msg, parse_mode='Markdown')
+            if results:
+                send_charts_async(Config.TG_CHAT_ID, results, trade_date)
             print(f"✅ 自动日报已推送（{len(results)} 只标的）")
 
         except Exception as e:
@@ -264,10 +299,6 @@ def daily_auto_task():
                 pass
 
 
-# 启动后台线程执行自动任务
-threading.Thread(target=daily_auto_task, daemon=True).start()
-
-
 # ==================== Webhook 路由 ====================
 
 @app.route('/webhook', methods=['POST'])
@@ -290,6 +321,10 @@ def index():
 # ==================== 启动时设置 Webhook ====================
 
 if __name__ == "__main__":
+    # 启动后台线程执行自动任务
+    # (放在 __main__ 内：图表渲染子进程以 spawn 方式启动时会重新导入本模块)
+    threading.Thread(target=daily_auto_task, daemon=True).start()
+
     bot.remove_webhook()
     time.sleep(1)
 
@@ -6,10 +6,11 @@ class StrategyAnalyzer:
     def __init__(self, data_manager):
         self.dm = data_manager
 
-    def run_daily_scan(self):
+    def run_daily_scan(self, trade_date=None):
+        """执行选股扫描，trade_date 为空时使用最近一个已收盘交易日"""
         print("🚀 [Strategy] 开始执行【完全体】策略...", flush=True)
         
-        trade_date = self.dm.get_trade_date()
+        trade_date = trade_date or self.dm.get_trade_date()
         print(f"📅 分析日期: {trade_date}", flush=True)
 
         # 1. 优先获取主线板块 (实时请求)
@@ -56,9 +57,10 @@ class StrategyAnalyzer:
             batch_codes = target_codes[i : i + batch_size]
             
             try:
-                # 从数据库批量读取 (History + MoneyFlow)
-                df_daily = self.dm.get_history_batch(batch_codes, days=Config.BOX_DAYS + 20)
-                df_flow = self.dm.get_moneyflow_batch(batch_codes, days=Config.FLOW_DAYS + 5)
+                # 从数据库批量读取 (History + MoneyFlow)，按交易日精确取窗口
+                # 日线: 今天 + 过去 BOX_DAYS 天；资金流: 最近 FLOW_DAYS 天
+                df_daily = self.dm.get_history_batch(batch_codes, trade_date, days=Config.BOX_DAYS + 1)
+                df_flow = self.dm.get_moneyflow_batch(batch_codes, trade_date, days=Config.FLOW_DAYS)
                 
                 if df_daily.empty: continue
 
@@ -74,6 +76,7 @@ class StrategyAnalyzer:
                         if len(df) < Config.BOX_DAYS: continue
 
                         curr = df.iloc[0] # 今天
+                        if curr['trade_date'] != trade_date: continue # 当日停牌
                         past = df.iloc[1:Config.BOX_DAYS+1] # 过去 N 天
                         
                         # === 核心策略逻辑 ===